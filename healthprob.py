@@ -1,20 +1,230 @@
 #!/usr/bin/env python3
 import os
 import platform
+import selectors
+import socket
+import struct
 import subprocess
+import sys
 import time
 import math
+from functools import lru_cache
 import matplotlib.pyplot as plt
+from matplotlib.collections import PathCollection
+from matplotlib.colors import to_rgba
+from matplotlib.path import Path
+import numpy as np
 
-def ping_device(ip):
-    param = "-n" if platform.system().lower() == "windows" else "-c"
-    cmd = ["ping", param, "1", ip]
+_IS_WINDOWS = platform.system().lower() == "windows"
+_PING_CMD_PREFIX = ("ping", "-n", "1") if _IS_WINDOWS else ("ping", "-c", "1")
+
+def _spawn_ping(ip):
+    """Start one `ping` for `ip` without waiting; None if it could not be started."""
     try:
-        res = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return res.returncode == 0
+        return subprocess.Popen([*_PING_CMD_PREFIX, ip], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception:
+        return None
+
+# most pings that can run at once in the fallback; bounds processes and fds, not latency
+PING_MAX_INFLIGHT = 256
+
+def ping_devices_subprocess(devices):
+    """Start a ping per device before waiting on any, so a sweep takes one ping timeout, not N."""
+    results = []
+    for start in range(0, len(devices), PING_MAX_INFLIGHT):
+        procs = [_spawn_ping(ip) for ip in devices[start:start + PING_MAX_INFLIGHT]]
+        results.extend(p is not None and p.wait() == 0 for p in procs)
+    return results
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_PACKET_LEN = 40
+ICMP_RCVBUF = 1 << 20
+# past a few hundred targets a back-to-back burst overflows the socket send buffer and echoes are dropped
+SEND_PACING_US = 1000
+PACING_MIN_TARGETS = 500
+
+
+def icmp_checksum(buf):
+    """RFC 1071 one's-complement checksum of an ICMP packet."""
+    words = np.frombuffer(buf, dtype=np.uint8)
+    if words.size % 2:
+        words = np.pad(words, (0, 1))
+    s = int(words.view(">u2").sum(dtype=np.uint64))
+    s = (s >> 16) + (s & 0xFFFF)
+    s = (s >> 16) + (s & 0xFFFF)
+    return ~s & 0xFFFF
+
+
+class IcmpProber:
+    """Ping many hosts from one ICMP socket instead of forking `ping` per host."""
+
+    def __init__(self):
+        self.ident = os.getpid() & 0xFFFF
+        self.seq = 0
+        self.sock = None
+        self.raw = False
+        self.pkt = bytearray(ICMP_PACKET_LEN)
+        self.pkt[0] = ICMP_ECHO_REQUEST
+        self.view = memoryview(self.pkt)
+        # unprivileged ping socket first, raw socket if we happen to be root
+        for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                self.sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+            except (OSError, AttributeError):
+                continue
+            self.raw = kind == socket.SOCK_RAW
+            self.sock.setblocking(False)
+            # replies to a whole sweep arrive in one burst; make room so none are dropped
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, ICMP_RCVBUF)
+            except OSError:
+                pass
+            break
+
+    def packet(self, seq):
+        # zero the checksum, write ident/seq/send-time in place, then fill the checksum
+        struct.pack_into("!HHHQ", self.pkt, 2, 0, self.ident, seq, time.perf_counter_ns())
+        struct.pack_into("!H", self.pkt, 2, icmp_checksum(self.view))
+        return self.pkt
+
+    def probe(self, targets, timeout=1.0, pacing_us=None, addrs=None):
+        """Send one echo to every target, then wait up to `timeout` for replies.
+
+        `addrs` are the matching sockaddrs from resolve_targets(); without them
+        every target is resolved on the spot. Sends are spaced `pacing_us` apart;
+        by default only sweeps larger than PACING_MIN_TARGETS are paced, at
+        SEND_PACING_US.
+        """
+        if addrs is None:
+            addrs = resolve_targets(targets)
+        if pacing_us is None:
+            pacing_us = SEND_PACING_US if len(targets) > PACING_MIN_TARGETS else 0
+        gap = pacing_us / 1e6
+        results = {t: False for t in targets}
+        pending = {}
+        last_send = time.perf_counter() - gap
+        for t, addr in zip(targets, addrs):
+            # nothing is sent for unresolved targets, so they take no pacing slot either
+            if addr is None:
+                continue
+            if gap:
+                time.sleep(max(0.0, last_send + gap - time.perf_counter()))
+                last_send = time.perf_counter()
+            self.seq = (self.seq + 1) & 0xFFFF
+            try:
+                self.sock.sendto(self.packet(self.seq), addr)
+                pending[self.seq] = (t, addr[0])
+            except OSError:
+                pass
+
+        deadline = time.perf_counter() + timeout
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.sock, selectors.EVENT_READ)
+            while pending:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not sel.select(remaining):
+                    break
+                self.drain(pending, results)
+        return results
+
+    def drain(self, pending, results):
+        while True:
+            try:
+                data, (src, _) = self.sock.recvfrom(1500)
+            except OSError:
+                return
+            # raw sockets, and datagram ICMP sockets on macOS/BSD, hand back the IPv4 header too;
+            # an echo reply (type 0) never starts with version nibble 4, so the packet itself tells
+            if data and data[0] >> 4 == 4:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8 or data[0] != ICMP_ECHO_REPLY:
+                continue
+            _, _, _, ident, seq = struct.unpack_from("!BBHHH", data)
+            # ping sockets rewrite the identifier, raw sockets see every reply on the host
+            if self.raw and ident != self.ident:
+                continue
+            hit = pending.get(seq)
+            if hit and hit[1] == src:
+                del pending[seq]
+                results[hit[0]] = True
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+
+
+def resolve_targets(targets):
+    """Resolve each target once to an (ip, 0) sockaddr, or None if it does not resolve."""
+    addrs = []
+    for t in targets:
+        try:
+            addrs.append((socket.gethostbyname(t), 0))
+        except OSError:
+            addrs.append(None)
+    return addrs
+
+def resolve_missing(targets, addrs):
+    """Retry only the targets whose last resolve failed; the rest keep their address."""
+    return [addr if addr is not None else resolve_targets([t])[0] for t, addr in zip(targets, addrs)]
+
+
+def ping_devices(devices, prober, addrs=None):
+    """Return a list of UP/DOWN booleans in the same order as `devices`."""
+    if not prober.sock:
+        # no ICMP socket (e.g. Windows without admin): fall back to forking ping
+        return ping_devices_subprocess(devices)
+    if addrs is None:
+        addrs = resolve_targets(devices)
+    status = prober.probe(devices, addrs=addrs)
+    # the socket is IPv4-only: IPv6 literals and names that did not resolve go to the ping command
+    rest = [ip for ip, addr in zip(devices, addrs) if addr is None]
+    if rest:
+        status.update(zip(rest, ping_devices_subprocess(rest)))
+    return [status[ip] for ip in devices]
+
+def _enable_windows_vt():
+    """Turn on ANSI escape handling in a Windows 10+ console; False if unsupported."""
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
     except Exception:
         return False
 
+
+def _console_clear_sequence():
+    """ANSI home + clear screen + clear scrollback, or "" where escapes would print as garbage."""
+    if not sys.stdout.isatty():
+        return ""
+    if _IS_WINDOWS:
+        # legacy consoles without VT support just scroll; never fall back to forking cls
+        return "\x1b[H\x1b[2J\x1b[3J" if _enable_windows_vt() else ""
+    return "" if os.environ.get("TERM", "") == "dumb" else "\x1b[H\x1b[2J\x1b[3J"
+
+
+_CLEAR = _console_clear_sequence()
+
+
+def _write_console(text):
+    """Write one frame straight to the stdout descriptor, bypassing the text layer."""
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        # no real descriptor (IDE consoles, some embedders): go through the stream
+        sys.stdout.write(text)
+        sys.stdout.flush()
+        return
+    # anything print() buffered must land before the frame
+    sys.stdout.flush()
+    data = memoryview(text.encode(sys.stdout.encoding or "utf-8", errors="replace"))
+    while data:
+        data = data[os.write(fd, data):]
+
 def read_devices(file_path="devices.txt"):
     try:
         with open(file_path, "r") as f:
@@ -24,63 +234,116 @@ def read_devices(file_path="devices.txt"):
         return []
 
 def compute_grid_positions(n, cols=6, x_gap=5.0, y_gap=6.0):
-    """Return list of (x,y) positions in a neat grid."""
+    """Return an (n, 2) array of (x, y) positions in a neat grid."""
     rows = math.ceil(n / cols)
-    positions = []
-    for i in range(n):
-        r = i // cols
-        c = i % cols
-        x = c * x_gap
-        y = -r * y_gap
-        positions.append((x, y))
+    if n == 0:
+        return np.zeros((0, 2)), cols, rows, x_gap, y_gap
+    r, c = np.divmod(np.arange(n), cols)
     # center grid around origin for symmetry
-    if n > 0:
-        last_row_count = n % cols if (n % cols) != 0 else cols
-        total_width = (cols - 1) * x_gap if n > cols else (last_row_count - 1) * x_gap
-        x_offset = -total_width / 2.0
-        total_height = (rows - 1) * y_gap
-        y_offset = total_height / 2.0
-        positions = [(x + x_offset, y + y_offset) for (x, y) in positions]
+    last_row_count = n % cols if (n % cols) != 0 else cols
+    total_width = (cols - 1) * x_gap if n > cols else (last_row_count - 1) * x_gap
+    total_height = (rows - 1) * y_gap
+    positions = np.stack([c * x_gap - total_width / 2.0, total_height / 2.0 - r * y_gap], axis=1)
+    return positions, cols, rows, x_gap, y_gap
+
+@lru_cache(maxsize=64)
+def compute_grid_positions_cached(n, cols, x_gap_q, y_gap_q):
+    """Memoized compute_grid_positions; gaps are given in integer tenths so the key hashes exactly."""
+    positions, cols, rows, x_gap, y_gap = compute_grid_positions(n, cols, x_gap_q / 10.0, y_gap_q / 10.0)
+    # the cache hands the same array to every caller
+    positions.setflags(write=False)
     return positions, cols, rows, x_gap, y_gap
 
-def draw_health_map(devices, results, ax, cols=6):
-    ax.clear()
-    ax.set_facecolor("black")
-    ax.axis("off")
-    ax.set_aspect("equal", adjustable="box")
-
-    radius = 1.8
-    positions, cols, rows, x_gap, y_gap = compute_grid_positions(len(devices), cols=cols)
-
-    for (ip, up), (x, y) in zip(zip(devices, results), positions):
-        color = "green" if up else "red"
-        txt = "UP" if up else "DOWN"
-        inside_color = "white" if up else "yellow"
-
-        # circle (with white edge for crispness)
-        circ = plt.Circle((x, y), radius, facecolor=color, edgecolor="white", linewidth=2, antialiased=True)
-        ax.add_patch(circ)
-
-        # text inside the circle
-        ax.text(x, y, txt, color=inside_color, ha="center", va="center",
-                fontsize=14, fontweight="bold")
-
-        # IP label below in BLACK text with white rounded box for readability
-        ax.text(x, y - (radius + 1.0), ip,
-                color="black", ha="center", va="center",
-                fontsize=11, fontweight="bold",
-                bbox=dict(boxstyle="round,pad=0.35", fc="white", ec="none", alpha=1.0))
-
-    # limits with padding
-    if devices:
-        width = max(1, (cols - 1)) * x_gap
-        height = max(1, (rows - 1)) * y_gap
-        pad_x = 3.0
-        pad_y = 3.0
-        ax.set_xlim(-width/2 - pad_x, width/2 + pad_x)
-        ax.set_ylim(-height/2 - (radius + 2.0) - pad_y, height/2 + (radius + 2.0) + pad_y)
-
-    ax.set_title("Live Network Device Health", color="white", fontsize=18, fontweight="bold", pad=20)
+# (circle face, status text, text colour), indexed by the UP/DOWN boolean
+STATUS_STYLE = (("red", "DOWN", "yellow"), ("green", "UP", "white"))
+FACE_RGBA = np.array([to_rgba(face) for face, _, _ in STATUS_STYLE])
+
+def circle_paths(positions, radius):
+    """One Path per circle: the unit circle scaled by `radius` and moved to each (x, y)."""
+    unit = Path.unit_circle()
+    verts = unit.vertices[None] * radius + np.asarray(positions, dtype=float).reshape(-1, 1, 2)
+    return [Path(v, unit.codes) for v in verts]
+
+class HealthMapView:
+    """Live health map that builds its artists once and blits status changes.
+
+    All circles are one animated PathCollection and the status texts are
+    animated artists, redrawn over a cached background; the IP labels,
+    title and limits only change on resize.
+    """
+
+    def __init__(self, fig, ax, devices, cols=6):
+        self.fig = fig
+        self.ax = ax
+        self.devices = devices
+        self.circles = None
+        self.status_texts = []
+        self.label_texts = []
+        self.bg = None
+        self._build(cols)
+        # every full redraw (first show, resize) refreshes the cached background
+        fig.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _build(self, cols):
+        ax = self.ax
+        ax.set_facecolor("black")
+        ax.axis("off")
+        ax.set_aspect("equal", adjustable="box")
+
+        radius = 1.8
+        positions, cols, rows, x_gap, y_gap = compute_grid_positions_cached(len(self.devices), cols, 50, 60)
+
+        # every circle (with white edge for crispness) in a single collection: one artist, one draw call
+        self.circles = PathCollection(circle_paths(positions, radius), facecolors=FACE_RGBA[0],
+                                      edgecolors="white", linewidths=2, antialiaseds=True, animated=True)
+        ax.add_collection(self.circles, autolim=False)
+
+        for ip, (x, y) in zip(self.devices, positions):
+            # text inside the circle
+            self.status_texts.append(ax.text(x, y, "DOWN", color="yellow", ha="center", va="center",
+                                             fontsize=14, fontweight="bold", animated=True))
+
+            # IP label below in BLACK text with white rounded box for readability
+            self.label_texts.append(ax.text(x, y - (radius + 1.0), ip,
+                                            color="black", ha="center", va="center",
+                                            fontsize=11, fontweight="bold",
+                                            bbox=dict(boxstyle="round,pad=0.35", fc="white", ec="none", alpha=1.0)))
+
+        # limits with padding
+        if self.devices:
+            width = max(1, (cols - 1)) * x_gap
+            height = max(1, (rows - 1)) * y_gap
+            pad_x = 3.0
+            pad_y = 3.0
+            ax.set_xlim(-width/2 - pad_x, width/2 + pad_x)
+            ax.set_ylim(-height/2 - (radius + 2.0) - pad_y, height/2 + (radius + 2.0) + pad_y)
+
+        ax.set_title("Live Network Device Health", color="white", fontsize=18, fontweight="bold", pad=20)
+
+    def _on_draw(self, event):
+        self.bg = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self.circles)
+        for txt in self.status_texts:
+            self.ax.draw_artist(txt)
+
+    def update(self, results):
+        self.circles.set_facecolor(FACE_RGBA[np.asarray(results, dtype=np.intp)])
+        for txt, up in zip(self.status_texts, results):
+            _, label, color = STATUS_STYLE[up]
+            txt.set_text(label)
+            txt.set_color(color)
+
+        canvas = self.fig.canvas
+        if self.bg is None:
+            # first frame: a full draw captures the background via draw_event
+            canvas.draw()
+            return
+        canvas.restore_region(self.bg)
+        self._draw_animated()
+        canvas.blit(self.ax.bbox)
 
 def main():
     devices = read_devices("devices.txt")
@@ -90,8 +353,18 @@ def main():
 
     # tune how many per row if you like
     COLS = 6
+    # seconds between probe rounds, including the probe and redraw time
+    TICK_SEC = 2.0
+    # failed lookups are retried this often; every name is looked up again on the slower refresh
+    RESOLVE_RETRY_SEC = 10.0
+    RESOLVE_REFRESH_SEC = 300.0
 
+    prober = IcmpProber()
+    # resolved up front and then only on the timers above, so most ticks never touch DNS
+    addrs = resolve_targets(devices)
+    resolved_at = retried_at = time.monotonic()
     fig, ax = plt.subplots(figsize=(16, 9), dpi=110)
+    view = HealthMapView(fig, ax, devices, cols=COLS)
     plt.ion()
     plt.show()
 
@@ -99,22 +372,30 @@ def main():
 
     try:
         while True:
-            results = [ping_device(ip) for ip in devices]
+            tick_start = time.perf_counter()
+            now = time.monotonic()
+            if now - resolved_at >= RESOLVE_REFRESH_SEC:
+                addrs = resolve_targets(devices)
+                resolved_at = retried_at = now
+            elif None in addrs and now - retried_at >= RESOLVE_RETRY_SEC:
+                addrs = resolve_missing(devices, addrs)
+                retried_at = now
+            results = ping_devices(devices, prober, addrs)
 
-            # console view
-            os.system('cls' if platform.system().lower() == 'windows' else 'clear')
-            print("Network Device Health Probe\n" + "-" * 40)
-            for ip, ok in zip(devices, results):
-                print(f"{ip:<20} -> {'UP' if ok else 'DOWN'}")
-            print("-" * 40)
+            # console view, built as one frame and written in one go
+            lines = ["Network Device Health Probe", "-" * 40]
+            lines.extend(f"{ip:<20} -> {'UP' if ok else 'DOWN'}" for ip, ok in zip(devices, results))
+            lines.append("-" * 40)
+            _write_console(_CLEAR + "\n".join(lines) + "\n")
 
-            draw_health_map(devices, results, ax, cols=COLS)
-            # refresh
-            plt.pause(0.5)
-            time.sleep(1.5)
+            view.update(results)
+            # pump GUI events, then sleep only what is left of the tick
+            fig.canvas.flush_events()
+            time.sleep(max(0.0, TICK_SEC - (time.perf_counter() - tick_start)))
 
     except KeyboardInterrupt:
         print("\n[✓] Monitoring stopped by user.")
+        prober.close()
         plt.ioff()
         plt.close()
 
@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 # monitor_devices.py
 
-import os, sys, platform, subprocess, time, math, re, socket, signal
+import os, sys, atexit, platform, shutil, subprocess, time, math, random, re, socket, string, signal, struct, selectors, asyncio, threading, queue, traceback
 from typing import Dict, Tuple, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import matplotlib
 matplotlib.use("TkAgg")
 import matplotlib.pyplot as plt
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
+from matplotlib.colors import to_rgba
+import numpy as np
 import paramiko
 from paramiko.ssh_exception import AuthenticationException, SSHException, NoValidConnectionsError, BadHostKeyException
 
@@ -28,31 +33,56 @@ if getattr(sys, "frozen", False):
 else:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEVICES_FILE = os.path.join(BASE_DIR, "devices.txt")
+_IS_WINDOWS = platform.system().lower()=="windows"
+_PING_CMD_PREFIX = ("ping","-n","1","-w","1000") if _IS_WINDOWS else ("ping","-c","1","-W","1")
 
 USERNAME = "admin"
 PASSWORDS = ["Cisco123", "Admin123"]
 SSH_TIMEOUT = 3.0
+SSH_KEEPALIVE_SEC = 30
+SSH_IDLE_SEC = 300
+# stays under sshd's default MaxStartups (10) when many devices come due together
+SSH_MAX_INFLIGHT = 8
 HOSTNAME_REFRESH_SEC = 120
+DNS_HOSTNAME_SEC = 3*HOSTNAME_REFRESH_SEC
 MODEL_REFRESH_SEC = 300
+# an "unknown" answer from SSH is retried sooner than a real one is refreshed
+HOSTNAME_NEGATIVE_SEC = MODEL_NEGATIVE_SEC = 30
 RADIUS_UP, RADIUS_DOWN = 1.3, 1.5
 LABEL_FS, STATUS_FS = 10, 12
 COLS = 7
+TICK_SEC, FRAME_SEC = 0.12, 0.15
 BLINK_PERIOD_SEC, DIM_ALPHA, FULL_ALPHA = 1.0, 0.25, 1.0
+UP_RGBA, DOWN_RGBA, EDGE_RGBA = to_rgba("green"), to_rgba("red"), to_rgba("white")
+# style lookup tables indexed by up (0/1); alpha is additionally indexed by the blink phase
+STATUS_STYLE = (("DOWN","yellow"),("UP","white"))
+RADIUS_LUT, FACE_LUT = np.array([RADIUS_DOWN,RADIUS_UP]), np.array([DOWN_RGBA,UP_RGBA])
+ALPHA_LUT = np.array([[DIM_ALPHA,FULL_ALPHA],[FULL_ALPHA,FULL_ALPHA]])
 SUFFIXES = (".elements.local", ".intel.com", ".corp.nandps.com")
-DEVICES_RELOAD_SEC, DNS_REFRESH_SEC = 10, 300
+DNS_REFRESH_SEC = 300
+DNS_NEGATIVE_SEC, DNS_PREFETCH_SEC, DNS_SWEEP_SEC = 1, 20, 5
+# ticks that keep failing this long mean the statuses on screen can no longer be trusted
+POLL_STALE_SEC = 30
+PROBE_UP_SEC, PROBE_RETRY_SEC, PROBE_DOWN_SEC, PROBE_RETRY_MAX = 5.0, 0.5, 2.0, 3
 
+# ip -> (value, expires), on the time.monotonic() clock
 _hostname_cache, _model_cache = {}, {}
+_ip_dns_names: Dict[str,str] = {}
 _dns_forward_cache, _dns_reverse_cache = {}, {}
 
 # -------- helpers ----------
+@lru_cache(maxsize=4096)
 def clean_hostname(hn: str) -> str:
     if not hn: return "unknown"
-    h = hn.strip()
+    h = hn.strip(); hl = h.lower()
+    if not hl.endswith(SUFFIXES): return h or "unknown"
+    # sequential, as before: a name can carry more than one suffix
     for sfx in SUFFIXES:
-        if h.lower().endswith(sfx): h = h[:-len(sfx)]
+        if hl.endswith(sfx): h, hl = h[:-len(sfx)], hl[:-len(sfx)]
     return h or "unknown"
 
-def wrap_text(s, width=16):
+@lru_cache(maxsize=4096)
+def wrap_text(s: str, width: int = 16) -> str:
     if len(s) <= width: return s
     lines = []
     while len(s) > width:
@@ -62,216 +92,823 @@ def wrap_text(s, width=16):
     lines.append(s)
     return "\n".join(lines)
 
-def is_ip(s):
-    try: socket.inet_aton(s); return True
-    except OSError: return False
-
-def run_silent(cmd):
-    if platform.system().lower()=="windows":
-        si = subprocess.STARTUPINFO(); si.dwFlags|=subprocess.STARTF_USESHOWWINDOW
-        CREATE_NO_WINDOW=0x08000000
-        return subprocess.run(cmd,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL,
-                              startupinfo=si,creationflags=CREATE_NO_WINDOW)
-    else:
-        return subprocess.run(cmd,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
-
-def dns_reverse(ip):
-    now=time.time()
+def is_numeric_host(s):
+    # a numeric-only lookup answers instantly for IPv4/IPv6 literals and never touches the resolver
+    try: socket.getaddrinfo(s,None,flags=socket.AI_NUMERICHOST); return True
+    except (socket.gaierror,UnicodeError,ValueError): return False
+
+def is_ipv4(s): return is_numeric_host(s) and ":" not in s
+
+# built once: on Windows every ping shares one hidden-window STARTUPINFO instead of allocating its own
+if _IS_WINDOWS:
+    _SI=subprocess.STARTUPINFO(); _SI.dwFlags|=subprocess.STARTF_USESHOWWINDOW
+    _SILENT_KW=dict(stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL,startupinfo=_SI,creationflags=0x08000000)  # CREATE_NO_WINDOW
+else:
+    _SILENT_KW=dict(stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+
+# getaddrinfo/gethostbyaddr expose no TTL, so answers live DNS_REFRESH_SEC and failures DNS_NEGATIVE_SEC
+def dns_reverse(ip,refresh=False,now=None):
+    now=now or time.monotonic()
     rec=_dns_reverse_cache.get(ip)
-    if rec and now-rec[1]<DNS_REFRESH_SEC: return rec[0]
+    if rec and not refresh and now<rec[1]: return rec[0]
     try: name=socket.gethostbyaddr(ip)[0]
     except Exception: name=""
-    _dns_reverse_cache[ip]=(name,now)
+    _dns_reverse_cache[ip]=(name,now+(DNS_REFRESH_SEC if name else DNS_NEGATIVE_SEC))
     return name
 
-def dns_forward(e):
-    now=time.time()
+def dns_forward(e,refresh=False,now=None):
+    now=now or time.monotonic()
     rec=_dns_forward_cache.get(e)
-    if rec and now-rec[2]<DNS_REFRESH_SEC: return rec[0],rec[1]
+    if rec and not refresh and now<rec[2]: return rec[0],rec[1]
     ip,cname="",""
     try:
-        if is_ip(e):
-            ip=e; cname=dns_reverse(ip)
+        if is_numeric_host(e):
+            ip=e; cname=dns_reverse(ip,refresh,now)
         else:
-            ip=socket.gethostbyname(e)
+            ip=socket.getaddrinfo(e,None,socket.AF_INET,socket.SOCK_RAW,0,socket.AI_ADDRCONFIG)[0][4][0]
             cname=socket.getfqdn(e)
     except Exception: pass
-    _dns_forward_cache[e]=(ip,cname,now)
+    _dns_forward_cache[e]=(ip,cname,now+(DNS_REFRESH_SEC if ip else DNS_NEGATIVE_SEC))
     return ip,cname
 
-def ping_target(t):
-    cmd=["ping","-n","1","-w","1000",t] if platform.system().lower()=="windows" else ["ping","-c","1","-W","1",t]
-    try: return run_silent(cmd).returncode==0
-    except Exception: return False
+def dns_refresh(e,now=None): return dns_forward(e,refresh=True,now=now)
 
-# ---------- SSH -------------
-def ssh_exec_once(ip, cmd):
-    for pwd in PASSWORDS:
-        client=None
+class DnsCache:
+    """Resolves devices.txt entries on a daemon thread; the draw loop only ever reads the cache.
+
+    Entries are re-resolved shortly before they expire, so get() keeps answering from a warm cache,
+    and version only moves when an answer actually changed.
+    """
+    def __init__(self,workers=8):
+        self.workers=workers; self.q=queue.Queue(); self.queued=set(); self.lock=threading.Lock(); self.version=0
+        threading.Thread(target=self._worker,name="dns",daemon=True).start()
+
+    def _enqueue(self,e):
+        with self.lock:
+            if e in self.queued: return
+            self.queued.add(e)
+        self.q.put(e)
+
+    def get(self,e,now=None):
+        rec=_dns_forward_cache.get(e)
+        if not rec or (now or time.monotonic())>=rec[2]: self._enqueue(e)
+        return (rec[0],rec[1]) if rec else ("","")
+
+    def known(self,e): return e in _dns_forward_cache
+
+    def _prefetch(self):
+        soon=time.monotonic()+DNS_PREFETCH_SEC
+        for e,rec in list(_dns_forward_cache.items()):
+            if rec[2]<=soon: self._enqueue(e)
+
+    def _worker(self):
+        last_sweep=time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers,thread_name_prefix="dns") as ex:
+            while True:
+                if time.monotonic()-last_sweep>=DNS_SWEEP_SEC: self._prefetch(); last_sweep=time.monotonic()
+                try: batch=[self.q.get(timeout=DNS_SWEEP_SEC)]
+                except queue.Empty: continue
+                while True:
+                    try: batch.append(self.q.get_nowait())
+                    except queue.Empty: break
+                before=[_dns_forward_cache.get(e,(None,None))[:2] for e in batch]
+                now=time.monotonic(); changed=before!=list(ex.map(dns_refresh,batch,[now]*len(batch)))
+                with self.lock:
+                    self.queued.difference_update(batch)
+                    if changed: self.version+=1
+
+_dns=None
+
+# ---------- ICMP -------------
+ICMP_ECHO_REQUEST, ICMP_ECHO_REPLY = 8, 0
+ICMP_PACKET_LEN = 40
+ICMP_RCVBUF = 1 << 20
+PING_TIMEOUT = 1.0
+# the subprocess fallback launches a whole sweep at once; the cap only guards process and fd limits
+PING_MAX_INFLIGHT = 256
+# past a few hundred targets a back-to-back burst overflows the socket send buffer and echoes are dropped
+SEND_PACING_US, PACING_MIN_TARGETS = 1000, 500
+
+def send_gap(n,pacing_us=None):
+    if pacing_us is None: pacing_us=SEND_PACING_US if n>PACING_MIN_TARGETS else 0
+    return pacing_us/1e6
+
+def icmp_checksum(buf):
+    a=np.frombuffer(buf,dtype=np.uint8)
+    if a.size%2: a=np.pad(a,(0,1))
+    s=int(a.view(">u2").sum(dtype=np.uint64))
+    s=(s>>16)+(s&0xFFFF); s=(s>>16)+(s&0xFFFF)
+    return ~s&0xFFFF
+
+class IcmpProber:
+    """One ICMP socket for the whole sweep: send every echo, then collect replies."""
+    def __init__(self):
+        self.ident=os.getpid()&0xFFFF; self.seq=0; self.sock=None; self.raw=False
+        self.pkt=bytearray(ICMP_PACKET_LEN); self.pkt[0]=ICMP_ECHO_REQUEST; self.view=memoryview(self.pkt)
+        for kind in (socket.SOCK_DGRAM,socket.SOCK_RAW):
+            try: self.sock=socket.socket(socket.AF_INET,kind,socket.IPPROTO_ICMP)
+            except (OSError,AttributeError): continue
+            self.raw=kind==socket.SOCK_RAW; self.sock.setblocking(False)
+            # a whole sweep's replies land at once; a default-sized buffer drops the tail of the burst
+            try: self.sock.setsockopt(socket.SOL_SOCKET,socket.SO_RCVBUF,ICMP_RCVBUF)
+            except OSError: pass
+            break
+
+    def packet(self,seq):
+        # checksum zeroed, then ident/seq/send-time written in place over the template
+        struct.pack_into("!HHHQ",self.pkt,2,0,self.ident,seq,time.perf_counter_ns())
+        struct.pack_into("!H",self.pkt,2,icmp_checksum(self.view))
+        return self.pkt
+
+    def send(self,t,addr,pending):
+        self.seq=(self.seq+1)&0xFFFF
+        try: self.sock.sendto(self.packet(self.seq),addr); pending[self.seq]=(t,addr[0])
+        except OSError: pass
+
+    def probe(self,targets,timeout=PING_TIMEOUT,pacing_us=None,addrs=None):
+        res={t:False for t in targets}; pending={}; gap=send_gap(len(targets),pacing_us); last=time.perf_counter()-gap
+        for t,addr in zip(targets,addrs or icmp_addrs(targets)):
+            # targets that never resolved are simply DOWN: no DNS on the probe path, and no pacing slot
+            if addr is None: continue
+            if gap: time.sleep(max(0.0,last+gap-time.perf_counter())); last=time.perf_counter()
+            self.send(t,addr,pending)
+        deadline=time.perf_counter()+timeout
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.sock,selectors.EVENT_READ)
+            while pending:
+                remaining=deadline-time.perf_counter()
+                if remaining<=0 or not sel.select(remaining): break
+                self.drain(pending,res)
+        return res
+
+    async def probe_async(self,targets,timeout=PING_TIMEOUT,pacing_us=None,addrs=None):
+        loop=asyncio.get_running_loop(); res={t:False for t in targets}; pending={}; ev=asyncio.Event()
+        addrs=addrs or icmp_addrs(targets)
+        def on_readable():
+            self.drain(pending,res)
+            if not pending: ev.set()
+        gap=send_gap(len(targets),pacing_us)
+        loop.add_reader(self.sock.fileno(),on_readable)
         try:
-            client=paramiko.SSHClient(); client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            client.connect(ip,username=USERNAME,password=pwd,timeout=SSH_TIMEOUT,
-                           look_for_keys=False,allow_agent=False,banner_timeout=SSH_TIMEOUT)
-            _,stdout,_=client.exec_command(cmd,timeout=SSH_TIMEOUT)
-            return True,stdout.read().decode(errors="ignore").strip()
+            # unpaced: a plain sendto burst, no task per echo; paced: replies keep draining between sends
+            sent=0
+            for t,addr in zip(targets,addrs):
+                if addr is None: continue
+                if gap and sent: await asyncio.sleep(gap)
+                self.send(t,addr,pending); sent+=1
+            if pending:
+                ev.clear()
+                try: await asyncio.wait_for(ev.wait(),timeout)
+                except asyncio.TimeoutError: pass
+        finally: loop.remove_reader(self.sock.fileno())
+        return res
+
+    def drain(self,pending,res):
+        while True:
+            try: data,(src,_)=self.sock.recvfrom(1500)
+            except OSError: return
+            # raw sockets, and datagram ones on macOS/BSD, include the IPv4 header; type 0 never reads as version 4
+            if data and data[0]>>4==4: data=data[(data[0]&0x0F)*4:]
+            if len(data)<8 or data[0]!=ICMP_ECHO_REPLY: continue
+            _,_,_,ident,seq=struct.unpack_from("!BBHHH",data)
+            # ping sockets rewrite the identifier, raw sockets see every reply on the host
+            if self.raw and ident!=self.ident: continue
+            hit=pending.get(seq)
+            if hit and hit[1]==src: del pending[seq]; res[hit[0]]=True
+
+    def close(self):
+        try: self.sock and self.sock.close()
         except Exception: pass
-        finally:
-            try: client and client.close()
-            except Exception: pass
+
+def icmp_addr(ip):
+    # canonical dotted quad, parsed once: replies come back from e.g. 10.0.0.1 even when devices.txt says 10.1
+    try: return (socket.inet_ntoa(socket.inet_aton(ip)),0)
+    except (OSError,TypeError): return None
+
+def icmp_addrs(targets): return [icmp_addr(t) if is_ipv4(t) else None for t in targets]
+
+_prober=None
+
+# ---------- SSH -------------
+# ip -> (transport, last_used, lock); the per-device lock serialises commands and (re)connects
+_ssh_transports: Dict[str, Tuple[paramiko.Transport, float, threading.Lock]] = {}
+_ssh_locks: Dict[str, threading.Lock] = {}
+_ssh_passwords: Dict[str, str] = {}
+# ip -> (shell channel, prompt), kept open on the pooled session between refreshes
+_ssh_shells: Dict[str, Tuple[paramiko.Channel, str]] = {}
+
+def ssh_lock(ip): return _ssh_locks.get(ip) or _ssh_locks.setdefault(ip,threading.Lock())
+
+# known_hosts is read once and shared by every pooled session; keys of new devices are remembered in memory only
+_HOST_KEYS=paramiko.HostKeys()
+try: _HOST_KEYS.load(os.path.expanduser("~/.ssh/known_hosts"))
+except Exception: pass  # missing or unreadable file: start empty
+
+def ssh_transport(ip):
+    # TCP connect, key exchange and host key check, no auth yet
+    t=paramiko.Transport(socket.create_connection((ip,22),timeout=SSH_TIMEOUT)); t.banner_timeout=SSH_TIMEOUT
+    try:
+        # like SSHClient.connect: negotiate the key types known_hosts lists for this host first, or the check is skipped
+        known=_HOST_KEYS.lookup(ip); opts=t.get_security_options()
+        if known is not None:
+            first=[k for k in known.keys() if k in opts.key_types]
+            opts.key_types=first+[k for k in opts.key_types if k not in first]
+        t.start_client(timeout=SSH_TIMEOUT)
+        key=t.get_remote_server_key()
+        # only hosts with no entry at all are learned; a listed host must present one of its listed keys
+        if known is None: _HOST_KEYS.add(ip,key.get_name(),key); return t
+        exp=known.get(key.get_name())
+        if exp is None or exp!=key: raise paramiko.BadHostKeyException(ip,key,exp or next(iter(known.values())))
+        return t
+    except Exception: t.close(); raise
+
+_ssh_bad_keys: Dict[str, str] = {}
+
+def report_bad_host_key(ip,e):
+    # a changed key is never logged into; say so once per key instead of silently showing "unknown"
+    fp=e.key.get_fingerprint().hex()
+    if _ssh_bad_keys.get(ip)!=fp:
+        _ssh_bad_keys[ip]=fp
+        sys.stderr.write(f"[!] {ip}: SSH host key changed (now {e.key.get_name()} {fp}), not logging in\n")
+
+def ssh_connect(ip):
+    # every password is tried on one transport, so a wrong guess costs a round trip, not another handshake
+    known=_ssh_passwords.get(ip); t=None
+    try:
+        for pwd in ([known] if known else [])+[p for p in PASSWORDS if p!=known]:
+            for _ in range(2):
+                if t is None or not t.is_active():
+                    if t: t.close()
+                    t=None; t=ssh_transport(ip)
+                try: t.auth_password(USERNAME,pwd)
+                except paramiko.AuthenticationException: break
+                except paramiko.SSHException:
+                    if t.is_active(): raise
+                    continue  # device hung up after a failed guess: reconnect and retry this password
+                if t.is_authenticated():
+                    t.set_keepalive(SSH_KEEPALIVE_SEC); _ssh_passwords[ip]=pwd; return t
+                break
+    except paramiko.BadHostKeyException as e: report_bad_host_key(ip,e)
+    except Exception: pass
+    if t: t.close()
+    return None
+
+def shell_drop(ip):
+    sh=_ssh_shells.pop(ip,None)
+    if sh:
+        try: sh[0].close()
+        except Exception: pass
+
+def ssh_drop(ip):
+    shell_drop(ip); rec=_ssh_transports.pop(ip,None)
+    if rec:
+        try: rec[0].close()
+        except Exception: pass
+
+def get_ssh_transport(ip):
+    # caller holds ssh_lock(ip)
+    rec=_ssh_transports.get(ip)
+    if rec:
+        if rec[0].is_active():
+            _ssh_transports[ip]=(rec[0],time.monotonic(),rec[2]); return rec[0]
+        ssh_drop(ip)
+    t=ssh_connect(ip)
+    if t: _ssh_transports[ip]=(t,time.monotonic(),ssh_lock(ip))
+    return t
+
+def ssh_reap_idle(now=None):
+    now=now or time.monotonic()
+    for ip,(_,last,lock) in list(_ssh_transports.items()):
+        if now-last>SSH_IDLE_SEC and lock.acquire(blocking=False):
+            try: ssh_drop(ip)
+            finally: lock.release()
+
+def ssh_close_all():
+    for ip in list(_ssh_transports): ssh_drop(ip)
+
+# main closes the pool itself before os._exit; this covers every other way out (errors, embedding)
+atexit.register(ssh_close_all)
+
+def ssh_exec(ip, cmd):
+    # reuse the pooled session; a dead one (keepalive lost, device reloaded) is reconnected once
+    with ssh_lock(ip):
+        for _ in range(2):
+            t=get_ssh_transport(ip)
+            if t is None: return False,""
+            try:
+                chan=t.open_session(timeout=SSH_TIMEOUT)
+                try:
+                    chan.settimeout(SSH_TIMEOUT); chan.exec_command(cmd)
+                    return True,chan.makefile("rb").read().decode(errors="ignore").strip()
+                finally: chan.close()
+            except Exception: ssh_drop(ip)
     return False,""
 
+_RE_PROMPT_END=re.compile(r'[\w\-.()/:]+[#>]\s*$')
+
+def read_until(chan,done,timeout=SSH_TIMEOUT):
+    buf=""; deadline=time.monotonic()+timeout
+    while time.monotonic()<deadline:
+        if chan.recv_ready():
+            buf+=chan.recv(65535).decode(errors="ignore")
+            if done(buf): return True,buf
+        elif chan.exit_status_ready(): break
+        else: time.sleep(0.02)
+    return False,buf
+
+def shell_open(t):
+    # one pty shell per session: the banner sets the prompt and paging is turned off once
+    chan=t.open_session(timeout=SSH_TIMEOUT); chan.get_pty(width=512); chan.invoke_shell()
+    ok,banner=read_until(chan,_RE_PROMPT_END.search)
+    if ok:
+        prompt=banner.rstrip().splitlines()[-1].strip(); chan.send("terminal length 0\n")
+        ok,_=read_until(chan,lambda b: b.rstrip().endswith(prompt))
+    if not ok: chan.close(); return None
+    return chan,prompt
+
+def ssh_shell(ip,cmds):
+    """Run cmds back to back in the device's pooled shell; returns (ok, [output per command]).
+
+    ok is None when no SSH session could be opened at all, False when only the shell failed."""
+    n=len(cmds)
+    with ssh_lock(ip):
+        # a reused shell that fails (device exec-timeout, reload) is reopened once; a fresh one is not retried
+        for _ in range(2):
+            t=get_ssh_transport(ip)
+            if t is None: return None,[]
+            sh=_ssh_shells.get(ip); fresh=sh is None or sh[0].closed
+            try:
+                if fresh:
+                    sh=shell_open(t)
+                    if sh is None: shell_drop(ip); return False,[]
+                    _ssh_shells[ip]=sh
+                chan,prompt=sh
+                # everything goes out in one write; the device echoes each command and ends it with a prompt
+                chan.send("".join(c+"\n" for c in cmds))
+                ok,out=read_until(chan,lambda b: b.count(prompt)>=n and b.rstrip().endswith(prompt),SSH_TIMEOUT*n)
+            except Exception: ssh_drop(ip); ok=False
+            if ok: break
+            shell_drop(ip)
+            if fresh: return False,[]
+        else: return False,[]
+    # parts: ["<cmd1>\r\n<out1>", ..., trailing ""]
+    return True,[p.partition("\n")[2].strip() for p in out.split(prompt)[:n]]
+
+# whole-output searches; [ \t] keeps each match on one line
+_RE_IOSXE_HOSTNAME=re.compile(r'hostname[ \t]+([\w\-.]+)')
+_RE_NXOS_HOSTNAME=re.compile(r'Hostname[ \t]*:[ \t]*([\w\-.]+)',re.I)
+# every byte outside [A-Za-z0-9._-] maps to NUL, so one C-level translate validates a name
+_HOSTNAME_TABLE=bytes(c if chr(c) in string.ascii_letters+string.digits+"._-" else 0 for c in range(256))
+
+def is_bareword(s: str) -> bool:
+    return bool(s) and b"\0" not in s.encode("ascii",errors="replace").translate(_HOSTNAME_TABLE)
+
 def parse_iosxe_hostname(out):
-    for line in out.splitlines():
-        m=re.search(r'hostname\s+([\w\-.]+)',line)
-        if m: return m.group(1)
-    return ""
+    s=out.strip()
+    if s.startswith("hostname ") and "\n" not in s and is_bareword(s[9:].strip()): return s[9:].strip()
+    m=_RE_IOSXE_HOSTNAME.search(out)
+    return m.group(1) if m else ""
 
-def get_hostname_via_ssh(ip):
-    ok,out=ssh_exec_once(ip,"show hostname")
-    if ok and out:
-        for l in out.splitlines():
-            m=re.search(r'Hostname\s*:\s*([\w\-.]+)',l,re.I)
-            if m: return m.group(1)
-        if re.match(r'^[\w\-.]+$',out.strip()): return out.strip()
-    ok,out=ssh_exec_once(ip,"show run | include ^hostname")
-    if ok and out:
-        hn=parse_iosxe_hostname(out)
+def parse_nxos_hostname(out):
+    # NX-OS usually answers with the bare name on one line: no regex needed
+    s=out.strip()
+    if s.partition("\n")[1]=="" and is_bareword(s): return s
+    m=_RE_NXOS_HOSTNAME.search(out)
+    return m.group(1) if m else ""
+
+HOSTNAME_CMDS = ("show hostname", "show run | include ^hostname")
+
+def parse_hostname(outs):
+    # outs yields the HOSTNAME_CMDS outputs in order: NX-OS first, then IOS-XE
+    for parse,out in zip((parse_nxos_hostname,parse_iosxe_hostname),outs):
+        hn=parse(out) if out else ""
         if hn: return hn
     return "unknown"
 
-def get_model_via_ssh(ip):
-    # IOS-XE first
-    ok,out=ssh_exec_once(ip,"show version | include Model Number")
-    if ok and out:
-        m=re.search(r'[Mm]odel\s+[Nn]umber\s*[:=]\s*([\w\-]+)',out)
-        if m: return m.group(1).strip()
-    # NX-OS show hardware
-    ok,out=ssh_exec_once(ip,"show hardware")
-    if ok and out:
-        m=re.search(r'[Mm]odel\s+number\s+is\s+([\w\-]+)',out)
-        if m: return m.group(1).strip()
-    # NX-OS fallback
-    ok,out=ssh_exec_once(ip,"show module")
-    if ok and out:
-        for line in out.splitlines():
-            if re.search(r'SUP',line,re.I): continue
-            m=re.search(r'^\s*\d+\s+\d+\s+.+?\s+([\w\-]+)\s+\S+',line)
+def get_hostname_via_ssh(ip):
+    # both probes in one shell write; the exec fallback stays lazy and skips IOS-XE once NX-OS answered
+    ok,outs=ssh_shell(ip,HOSTNAME_CMDS)
+    if ok: return parse_hostname(outs)
+    if ok is None: return "unknown"  # unreachable or login refused: exec would only reconnect per command
+    return parse_hostname(ssh_exec(ip,c)[1] for c in HOSTNAME_CMDS)
+
+MODEL_CMDS = ("show version | include Model Number", "show hardware", "show module")
+_RE_MODEL_NUMBER=re.compile(r'[Mm]odel\s+[Nn]umber\s*[:=]\s*([\w\-]+)')
+_RE_MODEL_IS=re.compile(r'[Mm]odel\s+number\s+is\s+([\w\-]+)')
+# first non-SUP module row in one multiline search; [ \t] keeps every field on its own line like the old per-line scan
+_RE_MODLINE=re.compile(r'^(?![^\n]*[Ss][Uu][Pp])[ \t]*\d+[ \t]+\d+[ \t]+.+?[ \t]+([\w\-]+)[ \t]+\S+',re.M)
+_RE_NK=re.compile(r'\b(N\dK[-\w]+)\b')
+
+def parse_model(outs):
+    # outs yields the MODEL_CMDS outputs in order; the first platform that answers wins
+    for i,out in enumerate(outs):
+        if not out: continue
+        if i==0:  # IOS-XE first
+            m=_RE_MODEL_NUMBER.search(out)
+            if m: return m.group(1).strip()
+        elif i==1:  # NX-OS show hardware
+            m=_RE_MODEL_IS.search(out)
+            if m: return m.group(1).strip()
+        else:  # NX-OS fallback
+            m=_RE_MODLINE.search(out) or _RE_NK.search(out)
             if m: return m.group(1).strip()
-        m2=re.search(r'\b(N\dK[-\w]+)\b',out)
-        if m2: return m2.group(1).strip()
     return "unknown"
 
-def get_hostname_cached(ip,tryssh):
-    now=time.time()
-    if ip in _hostname_cache and now-_hostname_cache[ip][1]<HOSTNAME_REFRESH_SEC:
-        return _hostname_cache[ip][0]
+def get_model_via_ssh(ip):
+    # all three probes in one shell session; devices that refuse a shell get them one exec at a time
+    ok,outs=ssh_shell(ip,MODEL_CMDS)
+    if ok: return parse_model(outs)
+    if ok is None: return "unknown"
+    return parse_model(ssh_exec(ip,c)[1] for c in MODEL_CMDS)
+
+def generic_ptr(h,ip):
+    # ISP/DHCP-style PTRs ("10-1-2-3.pool", "host-10.1.2.3", "1012003") name the address, not the device
+    hl=h.lower()
+    return ip in hl or ip.replace(".","-") in hl or h.replace(".","").replace("-","").isdigit()
+
+def hostname_from_dns(ip):
+    # the reverse-DNS name stands in for the SSH query, unless SSH once reported something else
+    h=_ip_dns_names.get(ip,"")
+    h=clean_hostname(h) if h else "unknown"
+    if h=="unknown" or is_numeric_host(h) or generic_ptr(h,ip): return ""
+    rec=_hostname_cache.get(ip)
+    return "" if rec and rec[0] not in ("unknown",h) else h
+
+def jittered(sec):
+    # +-25% so SSH refreshes across the fleet drift apart instead of expiring in lockstep
+    return sec*random.uniform(0.75,1.25)
+
+def get_hostname_cached(ip,tryssh,now=None):
+    now=now or time.monotonic(); rec=_hostname_cache.get(ip)
+    if rec and now<rec[1]: return rec[0]
+    hn=hostname_from_dns(ip)
+    if hn: _hostname_cache[ip]=(hn,now+DNS_HOSTNAME_SEC); return hn
     if tryssh:
-        hn=get_hostname_via_ssh(ip); _hostname_cache[ip]=(hn,now); return hn
-    return _hostname_cache.get(ip,("unknown",0))[0]
+        hn=get_hostname_via_ssh(ip)
+        _hostname_cache[ip]=(hn,now+(HOSTNAME_NEGATIVE_SEC if hn=="unknown" else jittered(HOSTNAME_REFRESH_SEC))); return hn
+    return rec[0] if rec else "unknown"
 
-def get_model_cached(ip,tryssh):
-    now=time.time()
-    if ip in _model_cache and now-_model_cache[ip][1]<MODEL_REFRESH_SEC:
-        return _model_cache[ip][0]
+def get_model_cached(ip,tryssh,now=None):
+    now=now or time.monotonic(); rec=_model_cache.get(ip)
+    if rec and now<rec[1]: return rec[0]
     if tryssh:
-        md=get_model_via_ssh(ip); _model_cache[ip]=(md,now); return md
-    return _model_cache.get(ip,("unknown",0))[0]
+        md=get_model_via_ssh(ip)
+        _model_cache[ip]=(md,now+(MODEL_NEGATIVE_SEC if md=="unknown" else jittered(MODEL_REFRESH_SEC))); return md
+    return rec[0] if rec else "unknown"
+
+class DeviceTable:
+    """devices.txt entries as parallel arrays, one slot per device, so per-tick passes are array ops."""
+    def __init__(self,originals,ips,dns_names,resolving):
+        n=len(originals)
+        self.originals=np.array(originals,dtype=str); self.ips=np.array(ips,dtype=str)
+        self.dns_names=np.array(dns_names,dtype=str); self.resolving=np.array(resolving,dtype=bool)
+        self.targets=[ip or o for o,ip in zip(originals,ips)]
+        self.has_ip=self.ips!=""; self.up=np.zeros(n,dtype=bool)
+        # sockaddr tuples built once per resolve so the send loop allocates nothing per echo
+        self.addrs=[icmp_addr(ip) if ip and ":" not in ip else None for ip in ips]
+        self.next_probe_ts=np.zeros(n); self.consec_fail=np.zeros(n,dtype=np.uint8)
+        # drawing state, only ever written by the GUI thread and handed to the collection as whole arrays
+        self.xs=np.zeros(n); self.ys=np.zeros(n); self.radii=np.full(n,RADIUS_DOWN); self.alpha=np.full(n,FULL_ALPHA)
+        self.colors=np.tile(DOWN_RGBA,(n,1)); self.edges=np.tile(EDGE_RGBA,(n,1))
+    def __len__(self): return len(self.targets)
+    def place(self,pos): self.xs[:]=pos[:,0]; self.ys[:]=pos[:,1]
+    def style(self,up,blink):
+        u=up.view(np.uint8)
+        self.alpha[:]=ALPHA_LUT[int(blink)][u]; self.radii[:]=RADIUS_LUT[u]
+        self.colors[:]=FACE_LUT[u]; self.colors[:,3]=self.alpha; self.edges[:,3]=self.alpha
+    def dim(self,idx,a): self.alpha[idx]=a; self.colors[idx,3]=a; self.edges[idx,3]=a
+    def due(self,now): return np.flatnonzero(self.next_probe_ts<=now)
+    def record(self,idx,upmap,now):
+        # UP devices are rechecked slowly, fresh failures retried fast, settled DOWN ones in between
+        ok=np.array([upmap.get(self.targets[i],False) for i in idx.tolist()],dtype=bool)
+        self.up[idx]=ok
+        fails=np.where(ok,0,np.minimum(self.consec_fail[idx].astype(np.int32)+1,255))
+        self.consec_fail[idx]=fails
+        self.next_probe_ts[idx]=now+np.where(ok,PROBE_UP_SEC,np.where(fails<PROBE_RETRY_MAX,PROBE_RETRY_SEC,PROBE_DOWN_SEC))
+    def ips_up(self): return self.ips[np.flatnonzero(self.up&self.has_ip)].tolist()
+    def carry_from(self,prev):
+        # entries still listed with the same target keep their status and probe schedule across a rebuild
+        old={k:i for i,k in enumerate(zip(prev.originals.tolist(),prev.targets))}
+        pairs=[(i,old[k]) for i,k in enumerate(zip(self.originals.tolist(),self.targets)) if k in old]
+        if not pairs: return
+        new,idx=(list(x) for x in zip(*pairs))
+        self.up[new]=prev.up[idx]; self.next_probe_ts[new]=prev.next_probe_ts[idx]; self.consec_fail[new]=prev.consec_fail[idx]
 
-class DeviceEntry:
-    def __init__(self,o,ip,dns): self.original=o; self.ip=ip; self.dns_name=dns
+def file_mtime(path):
+    try: return os.stat(path).st_mtime_ns
+    except OSError: return None
 
 def read_devices_file(path):
     try:
         with open(path) as f: return [l.strip() for l in f if l.strip()]
     except FileNotFoundError: return []
 
-def resolve_devices(lst):
-    res=[]
+def resolve_devices(lst,prev=None):
+    ips,names,resolving=[],[],[]; now=time.monotonic()
     for e in lst:
-        ip,cname=dns_forward(e)
-        if not ip: ip=e if is_ip(e) else ""
-        if is_ip(e) and not cname and ip: cname=dns_reverse(ip)
-        res.append(DeviceEntry(e,ip,cname))
-    return res
+        ip,cname=_dns.get(e,now)
+        if not ip: ip=e if is_numeric_host(e) else ""
+        ips.append(ip); names.append(cname); resolving.append(not _dns.known(e))
+        if ip: _ip_dns_names[ip]=cname
+    devs=DeviceTable(lst,ips,names,resolving)
+    if prev is not None: devs.carry_from(prev)
+    return devs
 
 # ---------- concurrency ----------
-def concurrent_ping(targets):
-    res={}
-    with ThreadPoolExecutor(max_workers=min(32,max(1,len(targets)))) as ex:
-        futs={ex.submit(ping_target,t):t for t in targets}
-        for f in as_completed(futs):
-            try: res[futs[f]]=f.result()
-            except Exception: res[futs[f]]=False
+# created once: the loop only queues work, it never pays thread start-up per tick
+SSH_POOL = ThreadPoolExecutor(max_workers=SSH_MAX_INFLIGHT, thread_name_prefix="ssh")
+# one long-lived worker for the blocking ICMP sweep: the prober socket is not shared between threads
+PROBE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="probe")
+atexit.register(lambda: SSH_POOL.shutdown(wait=False))
+atexit.register(lambda: PROBE_POOL.shutdown(wait=False))
+
+async def ping_subprocess(t,sem):
+    async with sem:
+        try: p=await asyncio.create_subprocess_exec(*_PING_CMD_PREFIX,t,**_SILENT_KW)
+        except Exception: return False
+        try: return await asyncio.wait_for(p.wait(),PING_TIMEOUT+0.5)==0
+        except asyncio.TimeoutError:
+            try: p.kill()
+            except ProcessLookupError: pass
+            await p.wait(); return False
+
+async def ping_subprocess_all(targets):
+    # no ICMP socket (e.g. Windows without admin): the loop supervises the forked pings, no thread blocked per probe
+    sem=asyncio.Semaphore(PING_MAX_INFLIGHT)
+    return dict(zip(targets,await asyncio.gather(*(ping_subprocess(t,sem) for t in targets))))
+
+# fping probes a whole sweep from one process; its -q summary lines land on stderr
+_FPING=shutil.which("fping")
+_RE_FPING=re.compile(r'^(\S+)\s*:\s*xmt/rcv/%loss\s*=\s*\d+/(\d+)/',re.M)
+
+async def fping_all(targets):
+    p=await asyncio.create_subprocess_exec(_FPING,"-c","1","-t",str(int(PING_TIMEOUT*1000)),"-q",*targets,
+                                           **{**_SILENT_KW,"stderr":asyncio.subprocess.PIPE})
+    try: _,err=await asyncio.wait_for(p.communicate(),PING_TIMEOUT+0.5+0.02*len(targets))
+    except asyncio.TimeoutError:
+        try: p.kill()
+        except ProcessLookupError: pass
+        await p.wait(); err=b""
+    res={t:False for t in targets}
+    for host,rcv in _RE_FPING.findall(err.decode(errors="ignore")):
+        if host in res: res[host]=rcv!="0"
     return res
 
-def concurrent_hostname_refresh(ips):
-    with ThreadPoolExecutor(max_workers=min(16,len(ips))) as ex:
-        for ip in ips: ex.submit(lambda i: _hostname_cache.update({i:(get_hostname_via_ssh(i),time.time())}),ip)
+async def ping_forked(targets):
+    if _FPING and targets:
+        try: return await fping_all(targets)
+        except OSError: pass
+    return await ping_subprocess_all(targets)
+
+async def ping_async(targets,addrs=None):
+    global _prober
+    if _prober is None: _prober=IcmpProber()
+    if not _prober.sock: return await ping_forked(targets)
+    addrs=addrs or icmp_addrs(targets)
+    # the Windows proactor loop has no add_reader, so the blocking selector sweep runs off the loop there
+    if _IS_WINDOWS: sweep=asyncio.get_running_loop().run_in_executor(PROBE_POOL,_prober.probe,targets,PING_TIMEOUT,None,addrs)
+    else: sweep=_prober.probe_async(targets,PING_TIMEOUT,addrs=addrs)
+    # the socket is IPv4-only: IPv6 literals and names without a cached address go to forked pings alongside it
+    rest=[t for t,a in zip(targets,addrs) if a is None]
+    if not rest: return await sweep
+    res,more=await asyncio.gather(sweep,ping_forked(rest)); res.update(more); return res
 
-def concurrent_model_refresh(ips):
-    with ThreadPoolExecutor(max_workers=min(16,len(ips))) as ex:
-        for ip in ips: ex.submit(lambda i: _model_cache.update({i:(get_model_via_ssh(i),time.time())}),ip)
+def ssh_refresh(ip):
+    # hostname and model back to back on the same pooled session, each only once its entry is stale
+    now=time.monotonic(); get_hostname_cached(ip,True,now); get_model_cached(ip,True,now)
+
+def ssh_due(ip,now):
+    h=_hostname_cache.get(ip); m=_model_cache.get(ip)
+    return not h or now>=h[1] or not m or now>=m[1]
+
+async def ssh_refresh_async(ip,sem,inflight):
+    # paramiko blocks, so the session work runs on SSH_POOL; the semaphore bounds logins in flight
+    try:
+        async with sem: await asyncio.get_running_loop().run_in_executor(SSH_POOL,ssh_refresh,ip)
+    except Exception: pass
+    finally: inflight.pop(ip,None)
+
+# ---------- network thread ----------
+class Poller(threading.Thread):
+    """Network thread: pings, DNS-driven rebuilds, devices.txt reloads and SSH refreshes.
+
+    Runs one asyncio loop for its whole life and publishes (devs, up, hostnames, models) under a lock
+    whenever the state changes; the GUI thread only ever calls snapshot().
+    """
+    def __init__(self):
+        super().__init__(name="network",daemon=True)
+        self.lock=threading.Lock(); self.version=0; self.data=None; self.failed=False; self.errors={}
+
+    def publish(self,data):
+        with self.lock: self.data=data; self.version+=1
+
+    def snapshot(self):
+        with self.lock: return self.version,self.data
+
+    def run(self):
+        global STOP_REQUESTED
+        try: asyncio.run(self.poll())
+        finally:
+            # a dead network thread must not leave the board showing its last statuses: the GUI goes down with it
+            if not STOP_REQUESTED:
+                self.failed=True; sys.stderr.write("[!] network thread stopped, exiting\n"); STOP_REQUESTED=True
+
+    def report(self,what):
+        # a failing tick is logged once per distinct error, not every TICK_SEC
+        err=traceback.format_exc()
+        if err!=self.errors.get(what): self.errors[what]=err; sys.stderr.write(f"[!] poll {what} failed, retrying:\n{err}")
+
+    async def poll(self):
+        # pings are awaited in place, SSH refreshes run as background tasks, so a slow login never holds up a probe round
+        mtime=raw=None; devs=resolve_devices([]); dns_seen=_dns.version
+        last_state=fail_since=None; sem=asyncio.Semaphore(SSH_MAX_INFLIGHT); inflight: Dict[str,asyncio.Task]={}
+        while not STOP_REQUESTED:
+            tick_start=time.perf_counter(); now=time.monotonic()
+            # one stat per tick; the file is only read and the table rebuilt when it was actually rewritten.
+            # mtime is taken only after a good read, and a bad one keeps probing the previous list
+            try:
+                m=file_mtime(DEVICES_FILE)
+                if m!=mtime or raw is None:
+                    new=read_devices_file(DEVICES_FILE); mtime=m
+                    if new!=raw: raw=new; devs=resolve_devices(raw,devs)
+                if _dns.version!=dns_seen: dns_seen=_dns.version; devs=resolve_devices(raw,devs)
+                self.errors.pop("reload",None)
+            except Exception: self.report("reload")
+            try: last_state=await self.tick(devs,now,last_state,sem,inflight); self.errors.pop("tick",None); fail_since=None
+            except Exception:
+                self.report("tick"); fail_since=fail_since or now
+                if now-fail_since>POLL_STALE_SEC: raise
+            await asyncio.sleep(max(0.0,TICK_SEC-(time.perf_counter()-tick_start)))
+
+    async def tick(self,devs,now,last_state,sem,inflight):
+        due=devs.due(now)
+        if due.size:
+            idx=due.tolist()
+            devs.record(due,await ping_async([devs.targets[i] for i in idx],[devs.addrs[i] for i in idx]),now)
+        for ip in devs.ips_up():
+            if ip not in inflight and ssh_due(ip,now): inflight[ip]=asyncio.create_task(ssh_refresh_async(ip,sem,inflight))
+        ssh_reap_idle(now)
+        # cache reads only; whatever the background refreshes have stored so far is what gets published
+        hmap,mmap={},{}
+        for ip in devs.ips[devs.has_ip].tolist(): hmap[ip]=get_hostname_cached(ip,False,now); mmap[ip]=get_model_cached(ip,False,now)
+        # publish only real changes; up is copied because record() updates it in place
+        # both maps are filled in table order, so their items hash stably without sorting
+        state=hash((tuple(devs.targets),devs.resolving.tobytes(),devs.up.tobytes(),
+                    tuple(hmap.items()),tuple(mmap.items())))
+        if state!=last_state: self.publish((devs,devs.up.copy(),hmap,mmap))
+        return state
 
 # ---------- drawing ----------
 def compute_grid_positions(n,cols,xgap,ygap):
+    # (n,2) array of centred grid positions, row-major like devices.txt
     rows=math.ceil(n/cols) if cols else 1
-    pos=[(c*xgap,-r*ygap) for i in range(n) for r,c in [(i//cols,i%cols)]]
-    if not pos: return pos,rows
+    if not n: return np.zeros((0,2)),rows
+    r,c=np.divmod(np.arange(n),cols)
     last_row=n%cols or cols
     width=(cols-1)*xgap if n>cols else (last_row-1)*xgap
-    xoff=-width/2; yoff=(rows-1)*ygap/2
-    return [(x+xoff,y+yoff) for x,y in pos],rows
-
-def draw_map(devs,upmap,hosts,models,ax,blink):
-    ax.clear(); ax.set_facecolor("black"); ax.axis("off"); ax.set_aspect("equal")
-    longest=12; labels=[]
-    for d in devs:
-        ip=d.ip or d.original
-        h=clean_hostname(hosts.get(ip,"unknown") or d.dns_name or "unknown")
-        m=models.get(ip,"unknown")
-        lbl=f"{wrap_text(h,16)}\n{m}\n{ip}"; labels.append(lbl)
-        longest=max(longest,max(len(x) for x in h.split()),len(m),len(ip))
+    return np.stack([c*xgap-width/2,(rows-1)*ygap/2-r*ygap],axis=1),rows
+
+# (ip, raw hostname, model) -> (label text, widest line); a frame only formats devices whose inputs changed
+_label_cache: Dict[Tuple[str,str,str],Tuple[str,int]] = {}
+def device_label(ip,hn_raw,model):
+    key=(ip,hn_raw,model); hit=_label_cache.get(key)
+    if hit is None:
+        h=clean_hostname(hn_raw)
+        hit=_label_cache[key]=(f"{wrap_text(h,16)}\n{model}\n{ip}",max(max(len(x) for x in h.split()),len(model),len(ip)))
+    return hit
+
+@lru_cache(maxsize=64)
+def compute_grid_positions_cached(n,cols,xgap_q,ygap_q):
+    # gaps in integer tenths so float spacing still gives a stable cache key
+    pos,rows=compute_grid_positions(n,cols,xgap_q/10,ygap_q/10)
+    pos.setflags(write=False)  # shared between callers through the cache
+    return pos,rows
+
+@lru_cache(maxsize=64)
+def grid_layout(n,longest):
+    """Positions and axis limits for n slots whose widest label is `longest` characters."""
     xgap=max(4.2,0.45*longest+1.8); ygap=5.4
-    pos,rows=compute_grid_positions(len(devs),COLS,xgap,ygap)
-    for d,(x,y),lbl in zip(devs,pos,labels):
-        t=d.ip or d.original; up=upmap.get(t,False)
-        alpha=FULL_ALPHA if up else (FULL_ALPHA if blink else DIM_ALPHA)
-        color="green" if up else "red"; txt="UP" if up else "DOWN"; tcol="white" if up else "yellow"
-        r=RADIUS_UP if up else RADIUS_DOWN
-        ax.add_patch(plt.Circle((x,y),r,facecolor=color,edgecolor="white",lw=1.8,alpha=alpha))
-        ax.text(x,y,txt,color=tcol,ha="center",va="center",fontsize=STATUS_FS,fontweight="bold",alpha=alpha)
-        ax.text(x,y-(r+1.0),lbl,color="black",ha="center",va="center",fontsize=LABEL_FS,fontweight="bold",
-                bbox=dict(boxstyle="round,pad=0.35",fc="white",ec="none",alpha=1.0))
-    if devs:
-        w=(COLS-1)*xgap; h=(rows-1)*ygap
-        ax.set_xlim(-w/2-2.5,w/2+2.5); ax.set_ylim(-h/2-3.5,h/2+3.5)
+    pos,rows=compute_grid_positions_cached(n,COLS,round(xgap*10),round(ygap*10))
+    if not n: return pos,None
+    w=(COLS-1)*xgap; h=(rows-1)*ygap
+    return pos,((-w/2-2.5,w/2+2.5),(-h/2-3.5,h/2+3.5))
+
+_UNIT_CIRCLE=Path.unit_circle()
+
+def circle_paths(xs,ys,radii):
+    # every circle is the shared unit-circle Bezier scaled and shifted in one broadcast, no Patch per device
+    verts=_UNIT_CIRCLE.vertices[None]*radii[:,None,None]+np.stack([xs,ys],axis=1)[:,None,:]
+    return [Path(v,_UNIT_CIRCLE.codes) for v in verts]
+
+def init_axes(ax):
+    # styled once; after this only the view's own artists and, on relayout, the limits change
+    ax.set_facecolor("black"); ax.axis("off"); ax.set_aspect("equal")
     ax.set_title("Live Network Device Health",color="white",fontsize=16,fontweight="bold",pad=16)
 
+class HealthMapView:
+    """Persistent map artists: one circle collection plus a status and a label text per slot.
+
+    Everything is animated and blitted over a cached background. A full draw happens only
+    when the grid geometry changes or the window is redrawn (draw_event re-captures it).
+    """
+    def __init__(self,fig,ax):
+        self.fig=fig; self.ax=ax; self.bg=None; self.n=-1; self.layout=None; self.pos=np.zeros((0,2))
+        self.coll=None; self.status=[]; self.labels=[]; self.down=np.zeros(0,dtype=int); self.devs=None; self._artists=[]
+        fig.canvas.mpl_connect("draw_event",self._on_draw)
+
+    def _build(self,n):
+        for a in self.artists(): a.remove()
+        self.coll=PathCollection([],linewidths=1.8,animated=True); self.ax.add_collection(self.coll)
+        kw=dict(ha="center",va="center",fontweight="bold",animated=True)
+        self.status=[self.ax.text(0,0,"",fontsize=STATUS_FS,**kw) for _ in range(n)]
+        self.labels=[self.ax.text(0,0,"",color="black",fontsize=LABEL_FS,**kw,
+                                  bbox=dict(boxstyle="round,pad=0.35",fc="white",ec="none",alpha=1.0)) for _ in range(n)]
+        self.n=n; self.geom=None; self.shown=[None]*n; self.shown_labels=[None]*n
+        self._artists=[self.coll]+self.status+self.labels
+
+    def artists(self): return self._artists
+
+    def _on_draw(self,event):
+        self.bg=self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        for a in self.artists(): self.ax.draw_artist(a)
+
+    def blit(self):
+        c=self.fig.canvas
+        if self.bg is None: c.draw(); return
+        c.restore_region(self.bg)
+        for a in self.artists(): self.ax.draw_artist(a)
+        c.blit(self.ax.bbox)
+
+    def update(self,devs,up,hosts,models,blink):
+        n=len(devs)
+        if n!=self.n: self._build(n)
+        if len(_label_cache)>4*max(n,1): _label_cache.clear()
+        labels,longest=[],12
+        for ip,dns,resolving in zip(devs.targets,devs.dns_names.tolist(),devs.resolving.tolist()):
+            lbl,w=device_label(ip,"resolving…" if resolving else (hosts.get(ip,"unknown") or dns or "unknown"),models.get(ip,"unknown"))
+            labels.append(lbl); longest=max(longest,w)
+        # grid and limits depend only on the slot count and the widest label
+        relayout=(n,longest)!=self.layout
+        if relayout:
+            self.layout=(n,longest); self.pos,limits=grid_layout(n,longest)
+            if limits: self.ax.set_xlim(*limits[0]); self.ax.set_ylim(*limits[1])
+        if relayout or devs is not self.devs: devs.place(self.pos)
+        self.devs=devs; self.down=np.flatnonzero(~up); devs.style(up,blink)
+        xs,ys,radii=devs.xs.tolist(),devs.ys.tolist(),devs.radii.tolist()
+        # circle paths only change with the grid or a status flip (UP/DOWN radii differ)
+        geom=(self.layout,devs.radii.tobytes())
+        if geom!=self.geom: self.geom=geom; self.coll.set_paths(circle_paths(devs.xs,devs.ys,devs.radii))
+        self.coll.set_facecolor(devs.colors); self.coll.set_edgecolor(devs.edges)
+        for i,(st,lb,u,x,y,lbl,r,a) in enumerate(zip(self.status,self.labels,up.tolist(),xs,ys,labels,radii,devs.alpha.tolist())):
+            st.set_alpha(a)
+            if self.shown[i]!=(u,x,y):
+                txt,tcol=STATUS_STYLE[u]; self.shown[i]=(u,x,y); st.set_position((x,y)); st.set_text(txt); st.set_color(tcol)
+            if self.shown_labels[i]!=(lbl,x,y-(r+1.0)):
+                self.shown_labels[i]=(lbl,x,y-(r+1.0)); lb.set_position((x,y-(r+1.0))); lb.set_text(lbl)
+        # new geometry: a full draw re-captures the background through draw_event
+        if relayout: self.fig.canvas.draw()
+        else: self.blit()
+
+    def set_blink(self,blink):
+        # only DOWN slots blink: re-alpha them and blit over the cached background, no layout, no full draw
+        alpha=FULL_ALPHA if blink else DIM_ALPHA; down=self.down
+        if not down.size: return
+        self.devs.dim(down,alpha); self.coll.set_facecolor(self.devs.colors); self.coll.set_edgecolor(self.devs.edges)
+        for i in down.tolist(): self.status[i].set_alpha(alpha)
+        self.blit()
+
 def main():
-    global STOP_REQUESTED
-    raw=read_devices_file(DEVICES_FILE); devs=resolve_devices(raw); last_reload=time.time()
+    global STOP_REQUESTED, _dns
+    _dns=DnsCache()
+    poller=Poller(); poller.start()
     fig,ax=plt.subplots(figsize=(18,10),dpi=110)
     try:
         mgr=plt.get_current_fig_manager()
         if hasattr(mgr,"window"): mgr.window.protocol("WM_DELETE_WINDOW",request_stop)
     except Exception: pass
+    init_axes(ax); view=HealthMapView(fig,ax)
     plt.ion(); plt.show()
-    blink=True; last_blink=time.time()
+    blink=True; last_blink=time.monotonic(); seen=0; drawn_blink=None; any_down=False
     while not STOP_REQUESTED:
         if not plt.fignum_exists(fig.number): break
-        now=time.time()
-        if now-last_reload>DEVICES_RELOAD_SEC:
-            new=read_devices_file(DEVICES_FILE)
-            if new!=raw: raw=new; devs=resolve_devices(raw)
-            last_reload=now
-        if now-last_blink>BLINK_PERIOD_SEC: blink=not blink; last_blink=now
-        targets=[d.ip or d.original for d in devs]; upmap=concurrent_ping(targets)
-        ips_up=[d.ip for d in devs if d.ip and upmap.get(d.ip,False)]
-        if ips_up: concurrent_hostname_refresh(ips_up); concurrent_model_refresh(ips_up)
-        hmap={d.ip:get_hostname_cached(d.ip,upmap.get(d.ip,False)) for d in devs if d.ip}
-        mmap={d.ip:get_model_cached(d.ip,upmap.get(d.ip,False)) for d in devs if d.ip}
-        draw_map(devs,upmap,hmap,mmap,ax,blink)
-        plt.pause(0.12)
-    plt.ioff(); plt.close('all'); os._exit(0)
+        frame_start=time.perf_counter(); now=time.monotonic()
+        # the blink clock only runs while something is DOWN; an all-UP board has nothing to animate
+        if not any_down: blink=True; last_blink=now
+        elif now-last_blink>BLINK_PERIOD_SEC: blink=not blink; last_blink=now
+        # the GUI thread only reads the latest snapshot: a new version is a redraw, a blink flip re-alphas DOWN artists
+        version,data=poller.snapshot()
+        if version!=seen:
+            seen=version; devs,up,hmap,mmap=data; any_down=not up.all()
+            view.update(devs,up,hmap,mmap,blink); drawn_blink=blink
+        elif any_down and blink!=drawn_blink: view.set_blink(blink); drawn_blink=blink
+        # idle time is spent inside the GUI event loop, so resizes and clicks are served while we wait;
+        # Tk treats a zero timeout as "run forever", hence the flush when the frame budget is already spent
+        left=FRAME_SEC-(time.perf_counter()-frame_start)
+        if left>0.001: fig.canvas.start_event_loop(left)
+        else: fig.canvas.flush_events()
+    STOP_REQUESTED=True; poller.join(timeout=2*SSH_TIMEOUT)
+    if _prober: _prober.close()
+    ssh_close_all()
+    plt.ioff(); plt.close('all'); os._exit(1 if poller.failed else 0)
 
 if __name__=="__main__": main()